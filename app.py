@@ -1,12 +1,19 @@
 import os
+import bisect
 import threading
+import time
 import json
 import customtkinter
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from media_library import LibraryScanner, MediaItem
+from media_library import LibraryScanner, MediaItem, EpisodeCache, TraversalPolicy, DEFAULT_SAMPLE_SIZE
+from scanner_service import ScannerClient
+from background_scan import BackgroundRescanner, RescanWindow
 
 CONFIG_FILE = "config.json"
+REMOTE_POLL_MS = 5000
+OUTLIER_THRESHOLD = 0.25  # Episodes this far from the season mean get flagged
+PLACEHOLDER_TAG = "placeholder"
 
 def load_config():
     if os.path.exists(CONFIG_FILE):
@@ -33,6 +40,92 @@ STATUS_RANK = {
     "": 6             # None
 }
 
+def format_size(item: MediaItem) -> str:
+    if item.is_estimate:
+        return f"~{item.avg_size_gb:.2f} ±{item.size_error_gb:.2f} GB"
+    return f"{item.avg_size_gb:6.2f} GB"
+
+def parse_size(text: str) -> float:
+    """Inverse of format_size for sorting; estimates sort by their mean."""
+    value = text.replace("GB", "").replace("~", "").split("±")[0]
+    try:
+        return float(value)
+    except ValueError:
+        return 0.0
+
+def reconcile_rows(current, new):
+    """
+    Diffs table rows keyed by path.
+
+    Args:
+        current: Dict of path -> row state currently shown.
+        new: Dict of path -> row state from the latest scan, in scan order.
+
+    Returns:
+        Tuple (inserts, updates, removes) of path lists. inserts keeps the
+        order of new; unchanged paths appear in none of the lists.
+    """
+    inserts = [path for path in new if path not in current]
+    updates = [path for path in new if path in current and current[path] != new[path]]
+    removes = [path for path in current if path not in new]
+    return inserts, updates, removes
+
+class _Descending:
+    """Wraps a sort value so it orders in reverse inside a composite key."""
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+def sort_value(values, tag, col_name, columns):
+    """Sortable value of one column for a row given as (values, tag)."""
+    if col_name == "Status":
+        return STATUS_RANK.get(tag or "", 6)
+    value = values[columns.index(col_name)]
+    if col_name == "Avg Size (GB)":
+        return parse_size(value)
+    return value.lower()
+
+def row_sort_key(values, tag, primary_sort, secondary_sort, columns):
+    """
+    Composite key that orders rows the same way sort_helper does, so single
+    rows can be placed with bisect instead of re-sorting the table.
+    """
+    key = []
+    for sort_spec in (primary_sort, secondary_sort):
+        if sort_spec:
+            col, rev = sort_spec
+            value = sort_value(values, tag, col, columns)
+            key.append(_Descending(value) if rev else value)
+    return tuple(key)
+
+def plan_sorted_placement(existing_keys, new_keys):
+    """
+    Plans where to place rows into an already sorted list without moving
+    the existing ones.
+
+    Args:
+        existing_keys: Sorted keys of the rows that stay in place.
+        new_keys: Keys of the rows to place.
+
+    Returns:
+        List of (new_keys index, position) in the order they must be
+        applied; each position counts the rows placed before it.
+    """
+    keys = list(existing_keys)
+    plan = []
+    for i in sorted(range(len(new_keys)), key=lambda i: new_keys[i]):
+        pos = bisect.bisect_right(keys, new_keys[i])
+        keys.insert(pos, new_keys[i])
+        plan.append((i, pos))
+    return plan
+
 def sort_helper(items, primary_sort, secondary_sort, value_getter):
     """
     Sorts a list of items based on primary and secondary sort specifications.
@@ -80,6 +173,25 @@ class App(customtkinter.CTk):
              self.config["media_statuses"] = self.item_statuses
              save_config(self.config)
 
+        # Thin client mode: read the index from a scanner service instead of scanning locally
+        self.scanner_url = self.config.get("scanner_url")
+        self.scanner_client = ScannerClient(self.scanner_url) if self.scanner_url else None
+        self.remote_generation = None
+
+        # Which folders are scanned, configured under "traversal"
+        self.traversal_policy = TraversalPolicy.from_config(self.config.get("traversal", {}))
+
+        # Throttled periodic rescans, configured under "background_rescan"
+        self.background_rescanner = None
+        # time.monotonic() at which the scan currently shown started; results
+        # from scans that started earlier are dropped
+        self.shown_scan_started = 0.0
+
+        # Episode drill-down: children are listed lazily when a row is opened
+        # In thin client mode row paths live on the server, so list them there
+        loader = self.scanner_client.episodes if self.scanner_client else None
+        self.episode_cache = EpisodeCache(max_size=self.config.get("episode_cache_size", 16), loader=loader)
+
         # Configure grid
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(1, weight=1)
@@ -88,7 +200,10 @@ class App(customtkinter.CTk):
         self.top_frame = customtkinter.CTkFrame(self)
         self.top_frame.grid(row=0, column=0, padx=20, pady=20, sticky="ew")
 
-        self.btn_select = customtkinter.CTkButton(self.top_frame, text="Select Library Folder", command=self.select_folder)
+        if self.scanner_client:
+            self.btn_select = customtkinter.CTkButton(self.top_frame, text="Rescan on Server", command=self.request_remote_rescan)
+        else:
+            self.btn_select = customtkinter.CTkButton(self.top_frame, text="Select Library Folder", command=self.select_folder)
         self.btn_select.pack(side="left", padx=10, pady=10)
 
         # Sort by Status Dropdown
@@ -102,6 +217,11 @@ class App(customtkinter.CTk):
         self.status_label = customtkinter.CTkLabel(self.top_frame, text="Ready to scan.")
         self.status_label.pack(side="left", padx=10)
 
+        # Table rows keyed by path so rescans can be reconciled in place
+        self.row_id_to_path = {}
+        self.path_to_row_id = {}
+        self.row_states = {}  # path -> (values, tag)
+
         # Sorting State
         self.primary_sort_col = None
         self.secondary_sort_col = None
@@ -146,7 +266,7 @@ class App(customtkinter.CTk):
                   background=[('active', '#404040')])
 
         self.columns = ("Name", "Season", "Group", "Resolution", "Source", "Video", "Audio", "Avg Size (GB)", "Verified")
-        self.tree = ttk.Treeview(self.tree_frame, columns=self.columns, show="headings",
+        self.tree = ttk.Treeview(self.tree_frame, columns=self.columns, show="tree headings",
                                  yscrollcommand=self.scrollbar.set, selectmode="browse")
 
         # Configure columns
@@ -154,10 +274,15 @@ class App(customtkinter.CTk):
             self.tree.heading(col, text=col, command=lambda c=col: self.on_header_click(c))
             self.tree.column(col, width=120, anchor="w")
 
+        # Narrow tree column that only holds the expand indicator
+        self.tree.column("#0", width=30, minwidth=30, stretch=False)
+
         # Bind Right Click for secondary sort
         self.tree.bind("<Button-3>", self.on_header_right_click)
         # Bind Left Click for checkboxes
         self.tree.bind("<Button-1>", self.on_tree_click)
+        # Bind row expand for episode drill-down
+        self.tree.bind("<<TreeviewOpen>>", self.on_tree_open)
 
         self.tree.column("Name", width=300)
         self.tree.column("Season", width=100)
@@ -172,13 +297,19 @@ class App(customtkinter.CTk):
         self.tree.tag_configure("blue", background="#4682b4", foreground="white")
         self.tree.tag_configure("orange", background="#ffa500", foreground="black")
         self.tree.tag_configure("red", background="#cd5c5c", foreground="white")
+        self.tree.tag_configure("episode", background="#232323", foreground="#cccccc")
+        self.tree.tag_configure("outlier", background="#5a2a2a", foreground="white")
 
         # Auto-load last library if exists
         last_lib = self.config.get("last_library_path")
-        if last_lib and os.path.exists(last_lib):
+        if self.scanner_client:
+            self.status_label.configure(text=f"Connecting to {self.scanner_url}...")
+            self.poll_remote()
+        elif last_lib and os.path.exists(last_lib):
             self.status_label.configure(text=f"Scanning: {last_lib}...")
             thread = threading.Thread(target=self.run_scan, args=(last_lib,))
             thread.start()
+            self.start_background_rescan(last_lib)
 
     def on_status_sort_change(self, choice):
         if choice == "Status: Best -> Worst":
@@ -221,18 +352,9 @@ class App(customtkinter.CTk):
         item_ids = self.tree.get_children('')
 
         def value_getter(item_id, col_name):
-            if col_name == "Status":
-                tags = self.tree.item(item_id, "tags")
-                tag = tags[0] if tags else ""
-                return STATUS_RANK.get(tag, 6)
-            elif col_name == "Avg Size (GB)":
-                val = self.tree.set(item_id, col_name)
-                try:
-                    return float(val.replace(" GB", ""))
-                except ValueError:
-                    return 0.0
-            else:
-                return self.tree.set(item_id, col_name).lower()
+            # Read from row_states rather than making a Tk call per row
+            values, tag = self.row_states[self.row_id_to_path[item_id]]
+            return sort_value(values, tag, col_name, self.columns)
 
         sorted_ids = sort_helper(item_ids, self.primary_sort_col, self.secondary_sort_col, value_getter)
 
@@ -250,46 +372,276 @@ class App(customtkinter.CTk):
             # Run scan in background thread
             thread = threading.Thread(target=self.run_scan, args=(folder_selected,))
             thread.start()
+            self.start_background_rescan(folder_selected)
+
+    def start_background_rescan(self, path):
+        settings = self.config.get("background_rescan")
+        if not settings or not settings.get("enabled", True):
+            return
+
+        if self.background_rescanner:
+            # Do not block the UI; the old worker exits at its next throttled operation
+            self.background_rescanner.stop(timeout=0)
+
+        window = None
+        if "window_start_hour" in settings and "window_end_hour" in settings:
+            window = RescanWindow(settings["window_start_hour"], settings["window_end_hour"])
+
+        def on_complete(items, started_at):
+            status = f"Background rescan complete. Found {len(items)} items."
+            self.after(0, lambda: self.apply_scan_results(items, started_at, status))
+
+        self.background_rescanner = BackgroundRescanner(
+            path, on_complete,
+            interval=settings.get("interval_minutes", 60) * 60,
+            ops_per_second=settings.get("ops_per_second", 50),
+            window=window,
+            latency_threshold=settings.get("latency_threshold_ms", 500) / 1000,
+            pause_seconds=settings.get("pause_seconds", 30),
+            policy=self.traversal_policy,
+        )
+        self.background_rescanner.start()
+
+    def apply_scan_results(self, items, started_at, status_text=None):
+        if started_at < self.shown_scan_started:
+            return  # A newer scan has already been shown
+        self.shown_scan_started = started_at
+        self.update_table(items, status_text)
 
     def run_scan(self, path):
+        started_at = time.monotonic()
         try:
-            scanner = LibraryScanner(path)
-            items = scanner.scan()
+            if self.config.get("quick_scan", False):
+                # Show sampled estimates first, then refine them in the same thread
+                sample_size = self.config.get("quick_scan_sample_size", DEFAULT_SAMPLE_SIZE)
+                scanner = LibraryScanner(path, sample_size=sample_size, policy=self.traversal_policy)
+                estimates = scanner.scan()
+                estimated = sum(1 for item in estimates if item.is_estimate)
+                if estimated:
+                    status = f"Found {len(estimates)} items. Refining {estimated} estimated sizes..."
+                    self.after(0, lambda: self.apply_scan_results(estimates, started_at, status))
+                items = scanner.refine(estimates)
+            else:
+                scanner = LibraryScanner(path, policy=self.traversal_policy)
+                items = scanner.scan()
             # Update UI on main thread
-            self.after(0, lambda: self.update_table(items))
+            self.after(0, lambda: self.apply_scan_results(items, started_at))
         except Exception as e:
-            self.after(0, lambda: self.status_label.configure(text=f"Error: {e}"))
+            message = f"Error: {e}"
+            self.after(0, lambda: self.status_label.configure(text=message))
 
-    def update_table(self, items):
-        # Clear existing
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+    def poll_remote(self):
+        # One poll at a time; the next one is scheduled when this one finishes
+        thread = threading.Thread(target=self.run_remote_poll, args=(self.remote_generation,), daemon=True)
+        thread.start()
 
-        self.row_id_to_path = {}
+    def run_remote_poll(self, known_generation):
+        items = None
+        generation = known_generation
+        try:
+            status = self.scanner_client.status()
+            if status["generation"] == 0 or status["generation"] == known_generation:
+                if status["state"] == "scanning":
+                    message = f"Server scanning: {status['root_path']}..."
+                elif status["state"] == "error":
+                    message = f"Server scan failed: {status['last_error']}"
+                else:
+                    message = None
+            else:
+                generation, items = self.scanner_client.fetch_all()
+                message = None
+        except Exception as e:
+            message = f"Scanner unavailable: {e}"
+        self.after(0, lambda: self.finish_remote_poll(items, generation, message))
+
+    def finish_remote_poll(self, items, generation, message):
+        if items is not None:
+            self.remote_generation = generation
+            self.update_table(items)
+        if message:
+            self.status_label.configure(text=message)
+        self.after(REMOTE_POLL_MS, self.poll_remote)
+
+    def request_remote_rescan(self):
+        def run():
+            try:
+                self.scanner_client.rescan()
+                self.after(0, lambda: self.status_label.configure(text="Rescan requested on server..."))
+            except Exception as e:
+                message = f"Scanner unavailable: {e}"
+                self.after(0, lambda: self.status_label.configure(text=message))
+        threading.Thread(target=run, daemon=True).start()
+
+    def build_row(self, item):
+        season_str = item.season if item.season else ""
+        avg_size_str = format_size(item)
+
+        status = self.item_statuses.get(item.path)
+        if status == "verified":
+            verified_mark = "☑"
+        elif status == "rejected":
+            verified_mark = "☒"
+        else:
+            verified_mark = "☐"
 
-        # Insert new items
-        for item in items:
-            season_str = item.season if item.season else ""
-            avg_size_str = f"{item.avg_size_gb:6.2f} GB"
+        values = (item.name, season_str, item.group, item.resolution, item.source, item.video_codec, item.audio_codec, avg_size_str, verified_mark)
+        return values, get_item_tag(item)
 
-            status = self.item_statuses.get(item.path)
-            if status == "verified":
-                verified_mark = "☑"
-            elif status == "rejected":
-                verified_mark = "☒"
-            else:
-                verified_mark = "☐"
+    def reset_episode_rows(self, row_id):
+        for child in self.tree.get_children(row_id):
+            self.tree.delete(child)
+        self.tree.insert(row_id, "end", text="", values=("Loading...",), tags=(PLACEHOLDER_TAG,))
 
-            values = (item.name, season_str, item.group, item.resolution, item.source, item.video_codec, item.audio_codec, avg_size_str, verified_mark)
-            tag = get_item_tag(item)
-            if tag:
-                item_id = self.tree.insert("", "end", values=values, tags=(tag,))
+    def insert_row(self, path, state, index):
+        values, tag = state
+        if tag:
+            row_id = self.tree.insert("", index, values=values, tags=(tag,))
+        else:
+            row_id = self.tree.insert("", index, values=values)
+
+        self.row_id_to_path[row_id] = path
+        self.path_to_row_id[path] = row_id
+        self.row_states[path] = state
+        self.reset_episode_rows(row_id)
+
+    def place_in_scan_order(self, new_states):
+        # New rows go to their index in scan order, so a new season lands next
+        # to its show; on a first load every row is appended at "end"
+        row_count = len(self.tree.get_children(''))
+        for index, path in enumerate(new_states):
+            if path not in self.path_to_row_id:
+                self.insert_row(path, new_states[path], "end" if index >= row_count else index)
+                row_count += 1
+
+    def place_sorted(self, updates, inserts, new_states):
+        # Only updated and inserted rows are placed, by bisecting against the
+        # rows that did not change; those stay where they are
+        if not (updates or inserts):
+            return
+        selection = self.tree.selection()
+        moved = [self.path_to_row_id[path] for path in updates]
+        if moved:
+            self.tree.detach(*moved)
+
+        def key(state):
+            values, tag = state
+            return row_sort_key(values, tag, self.primary_sort_col, self.secondary_sort_col, self.columns)
+
+        remaining = self.tree.get_children('')
+        existing_keys = [key(self.row_states[self.row_id_to_path[row_id]]) for row_id in remaining]
+        pending = updates + inserts
+        new_keys = [key(new_states[path]) for path in pending]
+
+        attached = len(remaining)
+        for i, pos in plan_sorted_placement(existing_keys, new_keys):
+            path = pending[i]
+            if path in self.path_to_row_id:
+                self.tree.move(self.path_to_row_id[path], '', pos)
             else:
-                item_id = self.tree.insert("", "end", values=values)
+                self.insert_row(path, new_states[path], "end" if pos >= attached else pos)
+            attached += 1
+
+        if moved and selection:
+            self.tree.selection_set(selection)
+
+    def first_visible_row(self):
+        # identify_row returns "" over the heading, so probe down past it
+        for y in range(0, self.tree.winfo_height(), 5):
+            row_id = self.tree.identify_row(y)
+            if row_id:
+                return row_id
+        return ""
+
+    def update_table(self, items, status_text=None):
+        # Reconcile against the current rows instead of rebuilding, so the
+        # selection, scroll position and open rows survive a rescan
+        anchor_row = self.first_visible_row()
+        first_visible = self.tree.yview()[0]
+        new_states = {item.path: self.build_row(item) for item in items}
+        inserts, updates, removes = reconcile_rows(self.row_states, new_states)
+
+        # Only changed or vanished folders can have stale episode listings
+        for path in updates + removes:
+            self.episode_cache.invalidate(path)
+
+        for path in removes:
+            row_id = self.path_to_row_id.pop(path)
+            self.row_id_to_path.pop(row_id, None)
+            self.row_states.pop(path)
+            self.tree.delete(row_id)
+
+        for path in updates:
+            row_id = self.path_to_row_id[path]
+            values, tag = new_states[path]
+            self.tree.item(row_id, values=values, tags=(tag,) if tag else ())
+            self.row_states[path] = new_states[path]
+            if self.tree.item(row_id, "open"):
+                thread = threading.Thread(target=self.run_episode_listing, args=(row_id, path), daemon=True)
+                thread.start()
+            else:
+                self.reset_episode_rows(row_id)
+
+        if self.primary_sort_col or self.secondary_sort_col:
+            self.place_sorted(updates, inserts, new_states)
+        else:
+            self.place_in_scan_order(new_states)
+
+        # Keep the same row at the top of the view; scrolling to the end first
+        # makes see() bring the anchor up to the top edge
+        if anchor_row and self.tree.exists(anchor_row):
+            self.tree.yview_moveto(1.0)
+            self.tree.see(anchor_row)
+        else:
+            self.tree.yview_moveto(first_visible)
+        self.status_label.configure(text=status_text or f"Scan complete. Found {len(items)} items.")
+
+    def on_tree_open(self, event):
+        row_id = self.tree.focus()
+        path = self.row_id_to_path.get(row_id)
+        if not path:
+            return
 
-            self.row_id_to_path[item_id] = item.path
+        children = self.tree.get_children(row_id)
+        if len(children) != 1 or PLACEHOLDER_TAG not in self.tree.item(children[0], "tags"):
+            return  # Already loaded
 
-        self.status_label.configure(text=f"Scan complete. Found {len(items)} items.")
+        if path in self.episode_cache:
+            self.show_episodes(row_id, self.episode_cache.get(path))
+        else:
+            thread = threading.Thread(target=self.run_episode_listing, args=(row_id, path), daemon=True)
+            thread.start()
+
+    def run_episode_listing(self, row_id, path):
+        try:
+            episodes = self.episode_cache.get(path)
+        except Exception as e:
+            message = f"Could not list episodes: {e}"
+            self.after(0, lambda: self.episode_listing_failed(row_id, message))
+            return
+        self.after(0, lambda: self.show_episodes(row_id, episodes))
+
+    def episode_listing_failed(self, row_id, message):
+        # Put the placeholder back so opening the row again retries
+        if self.tree.exists(row_id):
+            self.reset_episode_rows(row_id)
+            self.tree.item(row_id, open=False)
+        self.status_label.configure(text=message)
+
+    def show_episodes(self, row_id, episodes):
+        if not self.tree.exists(row_id):
+            return  # Table was rebuilt while listing
+
+        for child in self.tree.get_children(row_id):
+            self.tree.delete(child)
+
+        if not episodes:
+            self.tree.insert(row_id, "end", values=("No video files",), tags=("episode",))
+            return
+
+        for ep in episodes:
+            values = (ep.name, f"{ep.deviation:+.1%}", "", "", "", "", "", f"{ep.size_gb:6.2f} GB", "")
+            tag = "outlier" if abs(ep.deviation) >= OUTLIER_THRESHOLD else "episode"
+            self.tree.insert(row_id, "end", values=values, tags=(tag,))
 
     def on_tree_click(self, event):
         region = self.tree.identify_region(event.x, event.y)
@@ -328,6 +680,8 @@ class App(customtkinter.CTk):
 
                 # Update UI
                 self.tree.set(row_id, "Verified", new_mark)
+                values, tag = self.row_states[path]
+                self.row_states[path] = (values[:-1] + (new_mark,), tag)
 
                 # Save Config
                 self.config["media_statuses"] = self.item_statuses
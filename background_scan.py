@@ -0,0 +1,174 @@
+import datetime
+import threading
+import time
+from typing import Optional, Callable, List
+from media_library import LibraryScanner, MediaItem, TraversalPolicy
+
+class ScanCancelled(Exception):
+    """Raised from inside a throttled scan when its rescanner is stopped."""
+    pass
+
+class TokenBucket:
+    """
+    Classic token bucket: refills at `rate` tokens per second up to
+    `capacity`, and acquire() blocks until enough tokens are available.
+    """
+    def __init__(self, rate: float, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = self.capacity
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1.0):
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            self.sleep(wait)
+
+class RescanWindow:
+    """
+    Daily time window in local hours, e.g. RescanWindow(1, 6) for 01:00-06:00.
+    A window whose end is before its start wraps past midnight.
+    """
+    def __init__(self, start_hour: int, end_hour: int):
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+
+    def contains(self, moment: datetime.datetime) -> bool:
+        hour = moment.hour
+        if self.start_hour == self.end_hour:
+            return True  # Whole day
+        if self.start_hour < self.end_hour:
+            return self.start_hour <= hour < self.end_hour
+        return hour >= self.start_hour or hour < self.end_hour
+
+class IOThrottle:
+    """
+    Throttle handed to LibraryScanner. Every filesystem operation calls
+    acquire(), which waits for a token, for the time window to open, and for
+    directory listing latency to recover before letting the scan continue.
+    """
+    def __init__(self, ops_per_second: float, window: Optional[RescanWindow] = None,
+                 latency_threshold: float = 0.5, pause_seconds: float = 30.0, smoothing: float = 0.3,
+                 now: Callable[[], datetime.datetime] = datetime.datetime.now,
+                 sleep: Callable[[float], None] = time.sleep, clock: Callable[[], float] = time.monotonic):
+        self.bucket = TokenBucket(ops_per_second, clock=clock, sleep=sleep)
+        self.window = window
+        self.latency_threshold = latency_threshold
+        self.pause_seconds = pause_seconds
+        self.smoothing = smoothing
+        self.now = now
+        self.sleep = sleep
+        self.pauses = 0
+        self._latency: Optional[float] = None
+
+    @property
+    def latency(self) -> Optional[float]:
+        """Smoothed directory listing latency in seconds."""
+        return self._latency
+
+    @property
+    def overloaded(self) -> bool:
+        return self._latency is not None and self._latency > self.latency_threshold
+
+    def in_window(self) -> bool:
+        return self.window is None or self.window.contains(self.now())
+
+    def record_latency(self, seconds: float):
+        if self._latency is None:
+            self._latency = seconds
+        else:
+            self._latency = self.smoothing * seconds + (1 - self.smoothing) * self._latency
+
+    def acquire(self):
+        while not self.in_window():
+            self.sleep(self.pause_seconds)
+
+        if self.overloaded:
+            self.pauses += 1
+            self.sleep(self.pause_seconds)
+            # Forget the old measurement so the next listing probes the share again
+            self._latency = None
+
+        self.bucket.acquire()
+
+class BackgroundRescanner:
+    """
+    Periodically rescans a library on a daemon thread with an IOThrottle,
+    visiting recently modified show folders first. on_complete is called
+    from the worker thread with the new items and the time.monotonic() at
+    which the scan started, so callers can drop results older than ones
+    they already have.
+    """
+    def __init__(self, root_path: str, on_complete: Callable[[List[MediaItem], float], None],
+                 interval: float = 3600.0, ops_per_second: float = 50.0,
+                 window: Optional[RescanWindow] = None, latency_threshold: float = 0.5,
+                 pause_seconds: float = 30.0, policy: Optional[TraversalPolicy] = None):
+        self.root_path = root_path
+        self.policy = policy
+        self.on_complete = on_complete
+        self.interval = interval
+        self.throttle = IOThrottle(ops_per_second, window=window, latency_threshold=latency_threshold,
+                                   pause_seconds=pause_seconds, sleep=self._sleep)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sleep(self, seconds: float):
+        if self._stop.wait(seconds):
+            raise ScanCancelled()
+
+    def run_once(self) -> List[MediaItem]:
+        scanner = LibraryScanner(self.root_path, throttle=self.throttle, prioritize_recent=True,
+                                 policy=self.policy)
+        started_at = time.monotonic()
+        items = scanner.scan()
+        if self._stop.is_set():
+            raise ScanCancelled()
+        self.on_complete(items, started_at)
+        return items
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        # The first rescan waits a full interval; the caller has just scanned
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except ScanCancelled:
+                return
+            except Exception as e:
+                print(f"Error in background rescan: {e}")
@@ -0,0 +1,268 @@
+import argparse
+import gzip
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from typing import Optional, Dict, Callable
+
+# Mirrors the two os.stat_result fields the scanner uses
+FileStat = namedtuple("FileStat", ["st_size", "st_mtime"])
+
+class FileSystem(ABC):
+    """
+    Minimal filesystem interface the scanner runs against. scandir() returns
+    a list of entries exposing the os.DirEntry subset used by the scanner:
+    name, path, is_dir(), is_file(), is_symlink() and stat().
+    """
+    @abstractmethod
+    def scandir(self, path: str) -> list:
+        pass
+
+    @abstractmethod
+    def exists(self, path: str) -> bool:
+        pass
+
+    @abstractmethod
+    def isdir(self, path: str) -> bool:
+        pass
+
+class OSFileSystem(FileSystem):
+    def scandir(self, path: str) -> list:
+        with os.scandir(path) as entries:
+            return list(entries)
+
+    def exists(self, path: str) -> bool:
+        return os.path.exists(path)
+
+    def isdir(self, path: str) -> bool:
+        return os.path.isdir(path)
+
+DEFAULT_FILESYSTEM = OSFileSystem()
+
+class FileEntry:
+    __slots__ = ("name", "path", "_is_dir", "_stat")
+
+    def __init__(self, name: str, path: str, is_dir: bool, size: int = 0, mtime: float = 0.0):
+        self.name = name
+        self.path = path
+        self._is_dir = is_dir
+        self._stat = FileStat(size, mtime)
+
+    def is_dir(self) -> bool:
+        return self._is_dir
+
+    def is_file(self) -> bool:
+        return not self._is_dir
+
+    def is_symlink(self) -> bool:
+        return False
+
+    def stat(self) -> FileStat:
+        return self._stat
+
+    def __repr__(self):
+        return f"<FileEntry {self.path!r}>"
+
+class MemoryFileSystem(FileSystem):
+    """In-memory tree, built with add_dir() and add_file()."""
+    def __init__(self):
+        self._children: Dict[str, Dict[str, FileEntry]] = {}
+        self._entries: Dict[str, FileEntry] = {}
+
+    def add_dir(self, path: str, mtime: float = 0.0):
+        path = os.path.normpath(path)
+        if path in self._children:
+            # May have been created implicitly as a parent; keep the real mtime
+            if mtime and path in self._entries:
+                self._entries[path]._stat = FileStat(0, mtime)
+            return
+        parent, name = os.path.split(path)
+        # Relative paths bottom out at "." rather than ""
+        parent = parent or os.curdir
+        if path != os.curdir and name and parent != path:
+            self.add_dir(parent)
+            entry = FileEntry(name, path, True, mtime=mtime)
+            self._entries[path] = entry
+            self._children[parent][name] = entry
+        self._children[path] = {}
+
+    def add_file(self, path: str, size: int, mtime: float = 0.0):
+        path = os.path.normpath(path)
+        parent, name = os.path.split(path)
+        parent = parent or os.curdir
+        self.add_dir(parent)
+        entry = FileEntry(name, path, False, size=size, mtime=mtime)
+        self._entries[path] = entry
+        self._children[parent][name] = entry
+
+    def scandir(self, path: str) -> list:
+        path = os.path.normpath(path)
+        children = self._children.get(path)
+        if children is None:
+            if path in self._entries:
+                raise NotADirectoryError(f"Not a directory: {path}")
+            raise FileNotFoundError(f"No such directory: {path}")
+        return list(children.values())
+
+    def exists(self, path: str) -> bool:
+        path = os.path.normpath(path)
+        return path in self._children or path in self._entries
+
+    def isdir(self, path: str) -> bool:
+        return os.path.normpath(path) in self._children
+
+def _open_recording(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+class ReplayFileSystem(MemoryFileSystem):
+    """
+    MemoryFileSystem loaded from a listing written by record_listing().
+    The recorded tree is mounted at `root`, so the scanner is pointed at
+    that path instead of the original library location.
+    """
+    def __init__(self, root: str = "/replay"):
+        super().__init__()
+        self.root = os.path.normpath(root)
+        self.add_dir(self.root)
+
+    @classmethod
+    def load(cls, recording_path: str, root: str = "/replay") -> "ReplayFileSystem":
+        fs = cls(root)
+        with _open_recording(recording_path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                path = os.path.join(fs.root, *record["path"].split("/"))
+                if record.get("dir"):
+                    fs.add_dir(path, mtime=record.get("mtime", 0.0))
+                else:
+                    fs.add_file(path, record.get("size", 0), mtime=record.get("mtime", 0.0))
+        return fs
+
+def record_listing(root: str, output_path: str, fs: Optional[FileSystem] = None) -> int:
+    """
+    Walks root and writes one JSON line per directory and file with its
+    relative path, size and mtime. Returns the number of records written.
+    Unreadable directories are skipped, and so are symlinked directories,
+    since a link back up the tree would otherwise be walked until ELOOP.
+    """
+    fs = fs or DEFAULT_FILESYSTEM
+    count = 0
+    with _open_recording(output_path, "w") as out:
+        pending = [(root, "")]
+        while pending:
+            path, rel = pending.pop()
+            try:
+                entries = fs.scandir(path)
+            except OSError as e:
+                print(f"Error recording {path}: {e}")
+                continue
+            for entry in sorted(entries, key=lambda x: x.name):
+                if entry.is_symlink() and entry.is_dir():
+                    continue
+                entry_rel = f"{rel}/{entry.name}" if rel else entry.name
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                if entry.is_dir():
+                    out.write(json.dumps({"path": entry_rel, "dir": True, "mtime": st.st_mtime}) + "\n")
+                    pending.append((entry.path, entry_rel))
+                else:
+                    out.write(json.dumps({"path": entry_rel, "size": st.st_size, "mtime": st.st_mtime}) + "\n")
+                count += 1
+    return count
+
+class _LatencyEntry:
+    __slots__ = ("_entry", "_fs")
+
+    def __init__(self, entry, fs: "LatencyFileSystem"):
+        self._entry = entry
+        self._fs = fs
+
+    @property
+    def name(self) -> str:
+        return self._entry.name
+
+    @property
+    def path(self) -> str:
+        return self._entry.path
+
+    def is_dir(self) -> bool:
+        return self._entry.is_dir()
+
+    def is_file(self) -> bool:
+        return self._entry.is_file()
+
+    def is_symlink(self) -> bool:
+        return self._entry.is_symlink()
+
+    def stat(self):
+        self._fs.sleep(self._fs.stat_latency)
+        return self._entry.stat()
+
+class LatencyFileSystem(FileSystem):
+    """
+    Wraps another FileSystem and adds a fixed delay to each listing and
+    stat, e.g. to approximate a network share on local hardware.
+    """
+    def __init__(self, inner: FileSystem, listing_latency: float = 0.0, stat_latency: float = 0.0,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.inner = inner
+        self.listing_latency = listing_latency
+        self.stat_latency = stat_latency
+        self.sleep = sleep
+
+    def scandir(self, path: str) -> list:
+        self.sleep(self.listing_latency)
+        return [_LatencyEntry(entry, self) for entry in self.inner.scandir(path)]
+
+    def exists(self, path: str) -> bool:
+        self.sleep(self.stat_latency)
+        return self.inner.exists(path)
+
+    def isdir(self, path: str) -> bool:
+        self.sleep(self.stat_latency)
+        return self.inner.isdir(path)
+
+def main():
+    # Imported here to keep filesystem.py free of scanner dependencies
+    from media_library import LibraryScanner
+
+    parser = argparse.ArgumentParser(description="Record library listings and replay scans against them.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = subparsers.add_parser("record", help="Capture a listing of a real library")
+    record_parser.add_argument("root_path")
+    record_parser.add_argument("output", help="Output .jsonl (or .jsonl.gz) file")
+
+    replay_parser = subparsers.add_parser("replay", help="Time a scan against a recorded listing")
+    replay_parser.add_argument("recording")
+    replay_parser.add_argument("--listing-latency-ms", type=float, default=0.0)
+    replay_parser.add_argument("--stat-latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        count = record_listing(args.root_path, args.output)
+        print(f"Recorded {count} entries to {args.output}")
+        return
+
+    start = time.perf_counter()
+    fs = ReplayFileSystem.load(args.recording)
+    root = fs.root
+    print(f"Loaded recording in {time.perf_counter() - start:.2f}s")
+    if args.listing_latency_ms or args.stat_latency_ms:
+        fs = LatencyFileSystem(fs, args.listing_latency_ms / 1000, args.stat_latency_ms / 1000)
+
+    start = time.perf_counter()
+    items = LibraryScanner(root, fs=fs).scan()
+    print(f"Scanned {len(items)} items in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,14 @@
 import os
 import re
-from dataclasses import dataclass, field
-from typing import Optional, List, Dict
+import math
+import fnmatch
+import random
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Optional, List, Dict, Sequence, Callable
+from filesystem import FileSystem, DEFAULT_FILESYSTEM
 
 @dataclass
 class MediaItem:
@@ -15,27 +22,69 @@ class MediaItem:
     path: str = ""
     is_airing: bool = False
     avg_size_gb: float = 0.0
+    is_estimate: bool = False
+    size_error_gb: float = 0.0  # 95% error bound when is_estimate
 
     def __post_init__(self):
         # Clean up name if needed
         self.name = self.name.strip()
 
+@dataclass
+class EpisodeFile:
+    name: str
+    path: str
+    size_gb: float
+    deviation: float = 0.0  # Relative to the folder mean, e.g. 0.25 = 25% larger
+
 VIDEO_EXTENSIONS = {'.mkv', '.mp4', '.avi', '.mov', '.wmv', '.flv', '.webm', '.m4v', '.ts', '.m2ts'}
+BYTES_PER_GB = 1024 * 1024 * 1024
+DEFAULT_SAMPLE_SIZE = 12
+
+@dataclass
+class SizeEstimate:
+    avg_gb: float
+    error_gb: float = 0.0
+    sampled: int = 0
+    total: int = 0
+
+    @property
+    def is_exact(self) -> bool:
+        return self.sampled == self.total
+
+def _list_dir(path: str, throttle=None, fs: Optional[FileSystem] = None) -> list:
+    """
+    Lists a directory, charging the optional throttle one operation and
+    reporting how long the listing took so it can back off under load.
+    """
+    fs = fs or DEFAULT_FILESYSTEM
+    if throttle is None:
+        return fs.scandir(path)
 
-def calculate_average_size(folder_path: str) -> float:
+    throttle.acquire()
+    start = time.monotonic()
+    result = fs.scandir(path)
+    throttle.record_latency(time.monotonic() - start)
+    return result
+
+def _stat(entry, throttle=None):
+    if throttle is not None:
+        throttle.acquire()
+    return entry.stat()
+
+def calculate_average_size(folder_path: str, throttle=None, fs: Optional[FileSystem] = None) -> float:
+    fs = fs or DEFAULT_FILESYSTEM
     total_size = 0
     count = 0
     try:
-        if not os.path.exists(folder_path):
+        if not fs.exists(folder_path):
             return 0.0
 
-        with os.scandir(folder_path) as entries:
-            for entry in entries:
-                if entry.is_file():
-                    _, ext = os.path.splitext(entry.name)
-                    if ext.lower() in VIDEO_EXTENSIONS:
-                        total_size += entry.stat().st_size
-                        count += 1
+        for entry in _list_dir(folder_path, throttle, fs):
+            if entry.is_file():
+                _, ext = os.path.splitext(entry.name)
+                if ext.lower() in VIDEO_EXTENSIONS:
+                    total_size += _stat(entry, throttle).st_size
+                    count += 1
     except OSError as e:
         print(f"Error scanning files in {folder_path}: {e}")
         return 0.0
@@ -44,7 +93,183 @@ def calculate_average_size(folder_path: str) -> float:
         return 0.0
 
     avg_bytes = total_size / count
-    return avg_bytes / (1024 * 1024 * 1024)  # Convert to GB
+    return avg_bytes / BYTES_PER_GB  # Convert to GB
+
+def estimate_average_size(folder_path: str, sample_size: int = DEFAULT_SAMPLE_SIZE,
+                          rng: Optional[random.Random] = None, throttle=None,
+                          fs: Optional[FileSystem] = None) -> SizeEstimate:
+    """
+    Estimates the average video file size by stat-ing at most sample_size
+    randomly chosen files. Names still come from one directory listing, but
+    the number of stat calls no longer grows with the episode count.
+    error_gb is a 95% confidence bound with finite population correction.
+    """
+    if sample_size < 1:
+        raise ValueError(f"sample_size must be at least 1, got {sample_size}")
+    fs = fs or DEFAULT_FILESYSTEM
+    try:
+        if not fs.exists(folder_path):
+            return SizeEstimate(0.0)
+
+        videos = [entry for entry in _list_dir(folder_path, throttle, fs)
+                  if entry.is_file() and os.path.splitext(entry.name)[1].lower() in VIDEO_EXTENSIONS]
+
+        total = len(videos)
+        if total == 0:
+            return SizeEstimate(0.0)
+
+        if total > sample_size:
+            videos = (rng or random).sample(videos, sample_size)
+        sizes = [_stat(entry, throttle).st_size / BYTES_PER_GB for entry in videos]
+    except OSError as e:
+        print(f"Error sampling files in {folder_path}: {e}")
+        return SizeEstimate(0.0)
+
+    n = len(sizes)
+    mean = sum(sizes) / n
+    if n == total:
+        return SizeEstimate(mean, 0.0, n, total)
+
+    if n < 2:
+        # No spread information; report the mean itself as the bound
+        return SizeEstimate(mean, mean, n, total)
+
+    variance = sum((size - mean) ** 2 for size in sizes) / (n - 1)
+    fpc = math.sqrt((total - n) / (total - 1))
+    error = 1.96 * math.sqrt(variance / n) * fpc
+    return SizeEstimate(mean, error, n, total)
+
+def list_episode_files(folder_path: str, fs: Optional[FileSystem] = None) -> List[EpisodeFile]:
+    """
+    Lists the video files directly inside folder_path with their size and
+    deviation from the folder's mean size. Sorted by file name.
+    Raises OSError if the folder can't be listed, so callers can tell an
+    unreachable share apart from a folder without video files.
+    """
+    episodes = []
+    for entry in _list_dir(folder_path, fs=fs):
+        if entry.is_file():
+            _, ext = os.path.splitext(entry.name)
+            if ext.lower() in VIDEO_EXTENSIONS:
+                size_gb = entry.stat().st_size / BYTES_PER_GB
+                episodes.append(EpisodeFile(entry.name, entry.path, size_gb))
+
+    if episodes:
+        mean = sum(ep.size_gb for ep in episodes) / len(episodes)
+        if mean > 0:
+            for ep in episodes:
+                ep.deviation = (ep.size_gb - mean) / mean
+
+    episodes.sort(key=lambda ep: ep.name)
+    return episodes
+
+class EpisodeCache:
+    """
+    Small LRU cache of episode listings keyed by folder path. loader defaults
+    to list_episode_files on fs; a remote client can supply its own.
+    """
+    def __init__(self, max_size: int = 16, loader: Optional[Callable[[str], List[EpisodeFile]]] = None,
+                 fs: Optional[FileSystem] = None):
+        self.max_size = max_size
+        self.fs = fs
+        self.loader = loader or (lambda folder_path: list_episode_files(folder_path, fs=self.fs))
+        self._entries: "OrderedDict[str, List[EpisodeFile]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, folder_path: str) -> List[EpisodeFile]:
+        with self._lock:
+            if folder_path in self._entries:
+                self._entries.move_to_end(folder_path)
+                return self._entries[folder_path]
+
+        # List outside the lock so a slow share doesn't block other lookups.
+        # Failures propagate and are never cached, so a retry lists again.
+        episodes = self.loader(folder_path)
+        with self._lock:
+            self._entries[folder_path] = episodes
+            self._entries.move_to_end(folder_path)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return episodes
+
+    def invalidate(self, folder_path: str):
+        with self._lock:
+            self._entries.pop(folder_path, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, folder_path: str) -> bool:
+        with self._lock:
+            return folder_path in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+DEFAULT_SEASON_PATTERNS = ("season*",)
+# Hidden folders and NAS metadata/recycle bins, skipped at every level
+DEFAULT_EXCLUDE_PATTERNS = (".*", "@eaDir", "#recycle", "$RECYCLE.BIN")
+# Bonus material, only skipped inside a show since a series may be named "Extras"
+DEFAULT_SUBFOLDER_EXCLUDE_PATTERNS = ("extras", "featurettes", "samples", "sample")
+
+def _compile_globs(patterns: Sequence[str]) -> Optional[re.Pattern]:
+    if not patterns:
+        return None
+    return re.compile("|".join(fnmatch.translate(p) for p in patterns), re.IGNORECASE)
+
+@dataclass
+class TraversalPolicy:
+    """
+    Controls which folders LibraryScanner visits. Patterns are
+    case-insensitive globs matched against folder names.
+
+    max_depth: how many levels below a show folder are searched for seasons
+    include: show folders to scan (empty means all)
+    exclude: folders pruned at any level before they are listed
+    exclude_subfolders: folders pruned only below show level
+    season_patterns: folders treated as seasons
+    """
+    max_depth: int = 1
+    include: Sequence[str] = ()
+    exclude: Sequence[str] = DEFAULT_EXCLUDE_PATTERNS
+    exclude_subfolders: Sequence[str] = DEFAULT_SUBFOLDER_EXCLUDE_PATTERNS
+    season_patterns: Sequence[str] = DEFAULT_SEASON_PATTERNS
+    _include_re: Optional[re.Pattern] = field(init=False, repr=False, compare=False)
+    _exclude_re: Optional[re.Pattern] = field(init=False, repr=False, compare=False)
+    _subfolder_exclude_re: Optional[re.Pattern] = field(init=False, repr=False, compare=False)
+    _season_re: Optional[re.Pattern] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self._include_re = _compile_globs(self.include)
+        self._exclude_re = _compile_globs(self.exclude)
+        self._subfolder_exclude_re = _compile_globs(self.exclude_subfolders)
+        self._season_re = _compile_globs(self.season_patterns)
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "TraversalPolicy":
+        return cls(
+            max_depth=config.get("max_depth", 1),
+            include=tuple(config.get("include", ())),
+            exclude=tuple(config.get("exclude", DEFAULT_EXCLUDE_PATTERNS)),
+            exclude_subfolders=tuple(config.get("exclude_subfolders", DEFAULT_SUBFOLDER_EXCLUDE_PATTERNS)),
+            season_patterns=tuple(config.get("season_patterns", DEFAULT_SEASON_PATTERNS)),
+        )
+
+    def is_included(self, name: str) -> bool:
+        return self._include_re is None or bool(self._include_re.match(name))
+
+    def is_excluded(self, name: str) -> bool:
+        return self._exclude_re is not None and bool(self._exclude_re.match(name))
+
+    def is_subfolder_excluded(self, name: str) -> bool:
+        if self.is_excluded(name):
+            return True
+        return self._subfolder_exclude_re is not None and bool(self._subfolder_exclude_re.match(name))
+
+    def is_season(self, name: str) -> bool:
+        return self._season_re is not None and bool(self._season_re.match(name))
 
 class MediaParser:
     # Compile regexes for heuristic matching
@@ -158,42 +383,112 @@ class MediaParser:
         return new_item
 
 class LibraryScanner:
-    def __init__(self, root_path: str):
+    def __init__(self, root_path: str, sample_size: Optional[int] = None,
+                 throttle=None, prioritize_recent: bool = False, fs: Optional[FileSystem] = None,
+                 policy: Optional[TraversalPolicy] = None):
+        if sample_size is not None and sample_size < 1:
+            raise ValueError(f"sample_size must be at least 1, got {sample_size}")
         self.root_path = root_path
+        self.policy = policy or TraversalPolicy()
+        # Filesystem backend; defaults to the real OS, see filesystem.py
+        self.fs = fs or DEFAULT_FILESYSTEM
+        # When set, folder sizes are estimated from at most sample_size files
+        self.sample_size = sample_size
+        # Optional rate limiter with acquire() and record_latency(seconds),
+        # see background_scan.IOThrottle
+        self.throttle = throttle
+        # Visit the most recently modified show folders first
+        self.prioritize_recent = prioritize_recent
+
+    def _apply_size(self, item: MediaItem):
+        if self.sample_size is None:
+            item.avg_size_gb = calculate_average_size(item.path, self.throttle, self.fs)
+            return
+
+        estimate = estimate_average_size(item.path, self.sample_size, throttle=self.throttle, fs=self.fs)
+        item.avg_size_gb = estimate.avg_gb
+        item.is_estimate = not estimate.is_exact
+        item.size_error_gb = estimate.error_gb
+
+    def refine(self, items: List[MediaItem]) -> List[MediaItem]:
+        """
+        Returns a copy of items where every estimated size is replaced by the
+        exact average. Items that were already exact are passed through.
+        """
+        refined = []
+        for item in items:
+            if item.is_estimate:
+                item = replace(item, avg_size_gb=calculate_average_size(item.path, self.throttle, self.fs),
+                               is_estimate=False, size_error_gb=0.0)
+            refined.append(item)
+        return refined
+
+    def _sort_recent_first(self, entries: list) -> list:
+        def mtime(entry):
+            if not entry.is_dir():
+                return 0.0
+            try:
+                return _stat(entry, self.throttle).st_mtime
+            except OSError:
+                return 0.0
+        return sorted(entries, key=mtime, reverse=True)
+
+    def _find_seasons(self, path: str, depth: int = 1) -> list:
+        """
+        Returns season folder entries under path, descending into non-season
+        folders up to the policy's max_depth. Excluded folders are never listed.
+        """
+        seasons = []
+        sub_entries = _list_dir(path, self.throttle, self.fs)
+        # Sort to ensure consistent order (optional)
+        sub_entries.sort(key=lambda x: x.name)
+
+        for sub in sub_entries:
+            if not sub.is_dir() or self.policy.is_subfolder_excluded(sub.name):
+                continue
+            if self.policy.is_season(sub.name):
+                seasons.append(sub)
+            elif depth < self.policy.max_depth:
+                try:
+                    seasons.extend(self._find_seasons(sub.path, depth + 1))
+                except OSError:
+                    pass # Skip unreadable nested folders
+        return seasons
 
     def scan(self) -> List[MediaItem]:
         items = []
-        if not os.path.isdir(self.root_path):
+        if not self.fs.isdir(self.root_path):
             return items
 
         # Iterate only top level directories first
         try:
-            for entry in os.scandir(self.root_path):
-                if entry.is_dir():
-                    # Parse as a potential show/movie
-                    parent_item = MediaParser.parse_root_folder(entry.name, entry.path)
+            top_entries = [entry for entry in _list_dir(self.root_path, self.throttle, self.fs)
+                           if entry.is_dir() and not self.policy.is_excluded(entry.name)
+                           and self.policy.is_included(entry.name)]
+            if self.prioritize_recent:
+                top_entries = self._sort_recent_first(top_entries)
+
+            for entry in top_entries:
+                # Parse as a potential show/movie
+                parent_item = MediaParser.parse_root_folder(entry.name, entry.path)
 
-                    # Check for seasons
-                    has_seasons = False
+                # Check for seasons
+                has_seasons = False
+                if self.policy.max_depth >= 1:
                     try:
-                        sub_entries = list(os.scandir(entry.path))
-                        # Sort to ensure consistent order (optional)
-                        sub_entries.sort(key=lambda x: x.name)
-
-                        for sub in sub_entries:
-                            if sub.is_dir() and sub.name.lower().startswith("season"):
-                                has_seasons = True
-                                season_item = MediaParser.parse_season_override(sub.name, parent_item, sub.path)
-                                season_item.avg_size_gb = calculate_average_size(season_item.path)
-                                items.append(season_item)
+                        for sub in self._find_seasons(entry.path):
+                            has_seasons = True
+                            season_item = MediaParser.parse_season_override(sub.name, parent_item, sub.path)
+                            self._apply_size(season_item)
+                            items.append(season_item)
                     except OSError:
                         pass # Permission issue or not a dir
 
-                    # If no seasons found, add the parent item itself as the entry (Movie or Show without season folders)
-                    if not has_seasons:
-                        # Only add if it's not empty? Or assume valid?
-                        parent_item.avg_size_gb = calculate_average_size(parent_item.path)
-                        items.append(parent_item)
+                # If no seasons found, add the parent item itself as the entry (Movie or Show without season folders)
+                if not has_seasons:
+                    # Only add if it's not empty? Or assume valid?
+                    self._apply_size(parent_item)
+                    items.append(parent_item)
 
         except OSError as e:
             print(f"Error scanning directory: {e}")
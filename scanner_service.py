@@ -0,0 +1,379 @@
+import argparse
+import json
+import threading
+import time
+import urllib.parse
+import urllib.request
+from dataclasses import asdict, fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, List, Dict, Tuple
+from media_library import LibraryScanner, MediaItem, EpisodeFile, TraversalPolicy, list_episode_files, \
+    DEFAULT_EXCLUDE_PATTERNS, DEFAULT_SUBFOLDER_EXCLUDE_PATTERNS, DEFAULT_SEASON_PATTERNS
+from background_scan import IOThrottle
+from filesystem import FileSystem, DEFAULT_FILESYSTEM
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_PAGE_SIZE = 500
+FETCH_ATTEMPTS = 5
+
+SORTABLE_FIELDS = {f.name for f in fields(MediaItem)}
+
+def item_to_dict(item: MediaItem) -> dict:
+    return asdict(item)
+
+def item_from_dict(data: dict) -> MediaItem:
+    # Ignore unknown keys so older clients keep working against newer services
+    known = {k: v for k, v in data.items() if k in SORTABLE_FIELDS}
+    return MediaItem(**known)
+
+class ScannerService:
+    """
+    Keeps an in-memory index of MediaItems for a library root and refreshes it
+    periodically on a background thread. Meant to run on the machine that owns
+    the disks so that every stat is local.
+    """
+    def __init__(self, root_path: str, refresh_interval: float = 300.0, scanner_factory=None,
+                 fs: Optional[FileSystem] = None):
+        self.root_path = root_path
+        self.refresh_interval = refresh_interval
+        # Used for episode listings, and for scans unless a factory is given
+        self.fs = fs or DEFAULT_FILESYSTEM
+        self.scanner_factory = scanner_factory or (lambda root: LibraryScanner(root, fs=self.fs))
+
+        self._lock = threading.Lock()
+        self._items: List[MediaItem] = []
+        # Sorted copies of _items keyed by (sort, reverse), valid for _sorted_generation
+        self._sorted: Dict[Tuple[str, bool], List[MediaItem]] = {}
+        self._sorted_generation = 0
+        self._state = "idle"
+        self._generation = 0
+        self._last_started: Optional[float] = None
+        self._last_finished: Optional[float] = None
+        self._last_error: Optional[str] = None
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self) -> List[MediaItem]:
+        """Runs a full scan synchronously and swaps it into the index."""
+        with self._lock:
+            self._state = "scanning"
+            self._last_started = time.time()
+
+        try:
+            items = self.scanner_factory(self.root_path).scan()
+        except Exception as e:
+            with self._lock:
+                self._state = "error"
+                self._last_error = str(e)
+                self._last_finished = time.time()
+            raise
+
+        with self._lock:
+            self._items = items
+            self._generation += 1
+            self._state = "idle"
+            self._last_error = None
+            self._last_finished = time.time()
+        return items
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def request_refresh(self):
+        """Wakes the background loop so it rescans immediately."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing library index: {e}")
+            self._wake.wait(self.refresh_interval)
+            self._wake.clear()
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "root_path": self.root_path,
+                "state": self._state,
+                "generation": self._generation,
+                "item_count": len(self._items),
+                "last_started": self._last_started,
+                "last_finished": self._last_finished,
+                "last_error": self._last_error,
+            }
+
+    def query(self, offset: int = 0, limit: Optional[int] = None, sort: Optional[str] = None,
+              reverse: bool = False, filter_text: Optional[str] = None) -> Tuple[int, List[MediaItem], int]:
+        """
+        Returns (total matching, page of items, generation) from the current
+        index. filter_text is matched case-insensitively against the item name.
+        """
+        if sort is not None and sort not in SORTABLE_FIELDS:
+            raise ValueError(f"Unknown sort field: {sort}")
+
+        with self._lock:
+            # refresh() swaps in a new list rather than mutating, so no copy is needed
+            items = self._items
+            generation = self._generation
+
+        if sort:
+            items = self._sorted_items(items, generation, sort, reverse)
+
+        if filter_text:
+            needle = filter_text.lower()
+            items = [item for item in items if needle in item.name.lower()]
+
+        total = len(items)
+        offset = max(offset, 0)
+        end = total if limit is None else offset + max(limit, 0)
+        return total, items[offset:end], generation
+
+    def _sorted_items(self, items: List[MediaItem], generation: int, sort: str, reverse: bool) -> List[MediaItem]:
+        """
+        Returns items sorted by the given field, reusing the sorted list from
+        an earlier query of the same generation so paging stays cheap.
+        """
+        key = (sort, reverse)
+        with self._lock:
+            if self._sorted_generation == generation and key in self._sorted:
+                return self._sorted[key]
+
+        def sort_key(item):
+            value = getattr(item, sort)
+            if value is None:
+                return ""
+            return value.lower() if isinstance(value, str) else value
+        ordered = sorted(items, key=sort_key, reverse=reverse)
+
+        with self._lock:
+            if self._sorted_generation != generation:
+                if generation < self._sorted_generation:
+                    return ordered  # A newer index was cached meanwhile; don't replace it
+                self._sorted = {}
+                self._sorted_generation = generation
+            self._sorted[key] = ordered
+        return ordered
+
+    def episodes(self, folder_path: str) -> List[EpisodeFile]:
+        """
+        Lists the episode files of an indexed folder. Only paths of items in
+        the current index are accepted so clients can't browse the host.
+        """
+        with self._lock:
+            known = any(item.path == folder_path for item in self._items)
+        if not known:
+            raise KeyError(folder_path)
+        return list_episode_files(folder_path, fs=self.fs)
+
+class ScannerRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET  /status   -> service status
+    GET  /items    -> ?offset=&limit=&sort=&reverse=&filter=
+    GET  /episodes -> ?path= of an indexed item
+    POST /rescan  -> trigger an immediate background rescan
+    """
+    def _send_json(self, status_code: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        service = self.server.service
+        parsed = urllib.parse.urlparse(self.path)
+        params = urllib.parse.parse_qs(parsed.query)
+
+        def param(name, default=None):
+            values = params.get(name)
+            return values[0] if values else default
+
+        if parsed.path == "/status":
+            self._send_json(200, service.status())
+        elif parsed.path == "/items":
+            try:
+                offset = int(param("offset", 0))
+                limit = param("limit")
+                limit = int(limit) if limit is not None else None
+                reverse = param("reverse", "0").lower() in ("1", "true", "yes")
+                total, items, generation = service.query(offset=offset, limit=limit, sort=param("sort"),
+                                                         reverse=reverse, filter_text=param("filter"))
+            except ValueError as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            self._send_json(200, {
+                "total": total,
+                "offset": offset,
+                "generation": generation,
+                "items": [item_to_dict(item) for item in items],
+            })
+        elif parsed.path == "/episodes":
+            try:
+                episodes = service.episodes(param("path", ""))
+            except KeyError:
+                self._send_json(404, {"error": f"Not an indexed folder: {param('path', '')}"})
+                return
+            except OSError as e:
+                self._send_json(503, {"error": f"Could not list episodes: {e}"})
+                return
+            self._send_json(200, {"episodes": [asdict(ep) for ep in episodes]})
+        else:
+            self._send_json(404, {"error": f"Unknown path: {parsed.path}"})
+
+    def do_POST(self):
+        if urllib.parse.urlparse(self.path).path == "/rescan":
+            self.server.service.request_refresh()
+            self._send_json(202, {"queued": True})
+        else:
+            self._send_json(404, {"error": f"Unknown path: {self.path}"})
+
+    def log_message(self, format, *args):
+        # Keep the console quiet; the GUI polls frequently
+        pass
+
+def make_server(service: ScannerService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), ScannerRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+class ScannerClient:
+    """Thin HTTP client used by the GUI to read from a ScannerService."""
+    def __init__(self, base_url: str, timeout: float = 10.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, params: Optional[Dict] = None) -> dict:
+        url = self.base_url + path
+        if params:
+            url += "?" + urllib.parse.urlencode({k: v for k, v in params.items() if v is not None})
+        request = urllib.request.Request(url, method=method)
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read().decode("utf-8"))
+
+    def status(self) -> dict:
+        return self._request("GET", "/status")
+
+    def rescan(self) -> dict:
+        return self._request("POST", "/rescan")
+
+    def query(self, offset: int = 0, limit: Optional[int] = DEFAULT_PAGE_SIZE, sort: Optional[str] = None,
+              reverse: bool = False, filter_text: Optional[str] = None) -> Tuple[int, List[MediaItem], int]:
+        data = self._request("GET", "/items", {
+            "offset": offset,
+            "limit": limit,
+            "sort": sort,
+            "reverse": "1" if reverse else None,
+            "filter": filter_text,
+        })
+        return data["total"], [item_from_dict(d) for d in data["items"]], data["generation"]
+
+    def _sorted_items(self, items: List[MediaItem], generation: int, sort: str, reverse: bool) -> List[MediaItem]:
+        """
+        Returns items sorted by the given field, reusing the sorted list from
+        an earlier query of the same generation so paging stays cheap.
+        """
+        key = (sort, reverse)
+        with self._lock:
+            if self._sorted_generation == generation and key in self._sorted:
+                return self._sorted[key]
+
+        def sort_key(item):
+            value = getattr(item, sort)
+            if value is None:
+                return ""
+            return value.lower() if isinstance(value, str) else value
+        ordered = sorted(items, key=sort_key, reverse=reverse)
+
+        with self._lock:
+            if self._sorted_generation != generation:
+                if generation < self._sorted_generation:
+                    return ordered  # A newer index was cached meanwhile; don't replace it
+                self._sorted = {}
+                self._sorted_generation = generation
+            self._sorted[key] = ordered
+        return ordered
+
+    def episodes(self, folder_path: str) -> List[EpisodeFile]:
+        data = self._request("GET", "/episodes", {"path": folder_path})
+        return [EpisodeFile(**d) for d in data["episodes"]]
+
+    def fetch_all(self, page_size: int = DEFAULT_PAGE_SIZE) -> Tuple[int, List[MediaItem]]:
+        """
+        Returns (generation, items) for the whole index. If a rescan swaps the
+        index between pages, the fetch restarts so no pages are mixed.
+        """
+        for _ in range(FETCH_ATTEMPTS):
+            items = []
+            offset = 0
+            generation = None
+            while True:
+                total, page, page_generation = self.query(offset=offset, limit=page_size, sort="path")
+                if generation is None:
+                    generation = page_generation
+                elif page_generation != generation:
+                    break  # Index changed mid-fetch; start over
+                items.extend(page)
+                offset += len(page)
+                if not page or offset >= total:
+                    return generation, items
+        raise RuntimeError("Scanner index kept changing while fetching")
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless media library scanner service.")
+    parser.add_argument("root_path", help="Library root to index")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--interval", type=float, default=300.0, help="Seconds between rescans")
+    parser.add_argument("--ops-per-second", type=float, default=None,
+                        help="Limit filesystem operations per second during rescans")
+    parser.add_argument("--max-depth", type=int, default=1, help="Levels below a show folder searched for seasons")
+    parser.add_argument("--include", action="append", help="Show folder glob to scan; others are skipped (repeatable)")
+    parser.add_argument("--exclude", action="append", help="Folder glob to skip at any level (repeatable)")
+    parser.add_argument("--exclude-subfolder", action="append",
+                        help="Folder glob to skip inside show folders only (repeatable)")
+    parser.add_argument("--season-pattern", action="append", help="Folder glob treated as a season (repeatable)")
+    args = parser.parse_args()
+
+    policy = TraversalPolicy(
+        max_depth=args.max_depth,
+        include=tuple(args.include) if args.include else (),
+        exclude=tuple(args.exclude) if args.exclude else DEFAULT_EXCLUDE_PATTERNS,
+        exclude_subfolders=tuple(args.exclude_subfolder) if args.exclude_subfolder else DEFAULT_SUBFOLDER_EXCLUDE_PATTERNS,
+        season_patterns=tuple(args.season_pattern) if args.season_pattern else DEFAULT_SEASON_PATTERNS,
+    )
+    throttle = IOThrottle(args.ops_per_second) if args.ops_per_second else None
+    scanner_factory = lambda root: LibraryScanner(root, throttle=throttle, prioritize_recent=throttle is not None,
+                                                  policy=policy)
+
+    service = ScannerService(args.root_path, refresh_interval=args.interval, scanner_factory=scanner_factory)
+    service.start()
+    server = make_server(service, args.host, args.port)
+    print(f"Serving {args.root_path} on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+
+if __name__ == "__main__":
+    main()
@@ -8,7 +8,7 @@ sys.modules["customtkinter"] = MagicMock()
 sys.modules["tkinter"] = MagicMock()
 
 try:
-    from app import get_item_tag
+    from app import get_item_tag, format_size, parse_size, reconcile_rows, sort_helper, row_sort_key, plan_sorted_placement
 except ImportError:
     pass
 
@@ -62,5 +62,84 @@ class TestAppLogic(unittest.TestCase):
         item = MediaItem("Show", "Group", "1080p", "Remux", "H.264", "AAC")
         self.assertEqual(get_item_tag(item), "")
 
+    def test_size_format_round_trip(self):
+        item = MediaItem("Show", "Group", "1080p", "BD", "x265", "AAC", avg_size_gb=1.234)
+        self.assertEqual(format_size(item), "  1.23 GB")
+        self.assertAlmostEqual(parse_size(format_size(item)), 1.23)
+
+        item.is_estimate = True
+        item.size_error_gb = 0.05
+        self.assertEqual(format_size(item), "~1.23 ±0.05 GB")
+        self.assertAlmostEqual(parse_size(format_size(item)), 1.23)
+
+        self.assertEqual(parse_size(""), 0.0)
+
+    def test_reconcile_rows(self):
+        current = {
+            "/a": (("A", "1.00 GB"), "red"),
+            "/b": (("B", "2.00 GB"), ""),
+            "/c": (("C", "3.00 GB"), "green"),
+        }
+        new = {
+            "/d": (("D", "4.00 GB"), ""),
+            "/b": (("B", "2.50 GB"), ""),
+            "/a": (("A", "1.00 GB"), "red"),
+            "/e": (("E", "5.00 GB"), "blue"),
+        }
+
+        inserts, updates, removes = reconcile_rows(current, new)
+
+        self.assertEqual(inserts, ["/d", "/e"])
+        self.assertEqual(updates, ["/b"])
+        self.assertEqual(removes, ["/c"])
+
+    def test_reconcile_rows_unchanged(self):
+        rows = {"/a": (("A",), ""), "/b": (("B",), "red")}
+        self.assertEqual(reconcile_rows(rows, dict(rows)), ([], [], []))
+        self.assertEqual(reconcile_rows({}, rows), (["/a", "/b"], [], []))
+
+    COLUMNS = ("Name", "Season", "Avg Size (GB)")
+
+    def make_rows(self):
+        return {
+            "a": (("Bravo", "Season 01", "  2.00 GB"), "red"),
+            "b": (("alpha", "Season 02", "~1.50 ±0.10 GB"), "green"),
+            "c": (("Alpha", "Season 01", " 10.00 GB"), ""),
+            "d": (("charlie", "", "  2.00 GB"), "blue"),
+            "e": (("bravo", "Season 02", "  0.50 GB"), "red"),
+        }
+
+    def test_row_sort_key_matches_sort_helper(self):
+        rows = self.make_rows()
+        specs = [
+            (("Name", False), ("Avg Size (GB)", True)),
+            (("Avg Size (GB)", True), ("Name", False)),
+            (("Status", False), ("Season", True)),
+            (("Status", True), None),
+        ]
+        for primary, secondary in specs:
+            def value_getter(path, col):
+                values, tag = rows[path]
+                return row_sort_key(values, tag, (col, False), None, self.COLUMNS)[0]
+
+            expected = sort_helper(rows, primary, secondary, value_getter)
+            actual = sorted(rows, key=lambda p: row_sort_key(rows[p][0], rows[p][1], primary, secondary, self.COLUMNS))
+            self.assertEqual(actual, expected, (primary, secondary))
+
+    def test_plan_sorted_placement(self):
+        existing = [1, 3, 5, 7]
+        plan = plan_sorted_placement(existing, [6, 0, 3, 9])
+
+        # Applied in key order; positions account for earlier placements
+        self.assertEqual(plan, [(1, 0), (2, 3), (0, 5), (3, 7)])
+        result = list(existing)
+        for i, pos in plan:
+            result.insert(pos, [6, 0, 3, 9][i])
+        self.assertEqual(result, [0, 1, 3, 3, 5, 6, 7, 9])
+
+    def test_plan_sorted_placement_first_load_appends(self):
+        plan = plan_sorted_placement([], [3, 1, 2])
+        self.assertEqual([pos for _, pos in plan], [0, 1, 2])
+
 if __name__ == "__main__":
     unittest.main()
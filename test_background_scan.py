@@ -0,0 +1,127 @@
+import unittest
+import datetime
+import os
+import shutil
+import tempfile
+import time
+from background_scan import TokenBucket, RescanWindow, IOThrottle, BackgroundRescanner
+from media_library import LibraryScanner
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_rate_limited(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, capacity=5, clock=clock.time, sleep=clock.sleep)
+
+        for _ in range(5):
+            bucket.acquire()
+        self.assertEqual(clock.sleeps, [])
+
+        # Next five tokens need half a second at 10 ops/s
+        for _ in range(5):
+            bucket.acquire()
+        self.assertAlmostEqual(clock.now, 0.5)
+
+    def test_try_acquire(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1, capacity=1, clock=clock.time, sleep=clock.sleep)
+        self.assertTrue(bucket.try_acquire())
+        self.assertFalse(bucket.try_acquire())
+        clock.now += 1.0
+        self.assertTrue(bucket.try_acquire())
+
+    def test_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=0)
+
+class TestRescanWindow(unittest.TestCase):
+    def at(self, hour):
+        return datetime.datetime(2024, 1, 1, hour, 30)
+
+    def test_same_day_window(self):
+        window = RescanWindow(9, 17)
+        self.assertTrue(window.contains(self.at(9)))
+        self.assertTrue(window.contains(self.at(16)))
+        self.assertFalse(window.contains(self.at(17)))
+        self.assertFalse(window.contains(self.at(3)))
+
+    def test_overnight_window(self):
+        window = RescanWindow(23, 6)
+        self.assertTrue(window.contains(self.at(23)))
+        self.assertTrue(window.contains(self.at(2)))
+        self.assertFalse(window.contains(self.at(6)))
+        self.assertFalse(window.contains(self.at(12)))
+
+class TestIOThrottle(unittest.TestCase):
+    def test_pauses_when_listing_latency_is_high(self):
+        clock = FakeClock()
+        throttle = IOThrottle(100, latency_threshold=0.5, pause_seconds=30,
+                              sleep=clock.sleep, clock=clock.time)
+
+        throttle.record_latency(0.1)
+        throttle.acquire()
+        self.assertEqual(throttle.pauses, 0)
+
+        throttle.record_latency(2.0)
+        self.assertTrue(throttle.overloaded)
+        throttle.acquire()
+        self.assertEqual(throttle.pauses, 1)
+        self.assertIn(30, clock.sleeps)
+        self.assertFalse(throttle.overloaded)
+
+    def test_waits_for_window(self):
+        clock = FakeClock()
+        start = datetime.datetime(2024, 1, 1, 12, 0)
+        throttle = IOThrottle(100, window=RescanWindow(13, 14), pause_seconds=600,
+                              now=lambda: start + datetime.timedelta(seconds=clock.now),
+                              sleep=clock.sleep, clock=clock.time)
+
+        throttle.acquire()
+        self.assertGreaterEqual(clock.now, 3600)
+
+class TestThrottledScan(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        for i, name in enumerate(["Old Show", "Middle Show", "New Show"]):
+            path = os.path.join(self.test_dir, name)
+            os.makedirs(os.path.join(path, "Season 01"))
+            os.utime(path, (1000 + i, 1000 + i))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_recent_first_and_throttled(self):
+        clock = FakeClock()
+        throttle = IOThrottle(1000, sleep=clock.sleep, clock=clock.time)
+        items = LibraryScanner(self.test_dir, throttle=throttle, prioritize_recent=True).scan()
+
+        self.assertEqual([item.name for item in items], ["New Show", "Middle Show", "Old Show"])
+        self.assertIsNotNone(throttle.latency)
+
+    def test_background_rescanner_stops(self):
+        results = []
+        rescanner = BackgroundRescanner(self.test_dir, lambda items, started_at: results.append(items),
+                                        interval=0.01, ops_per_second=1000)
+        rescanner.start()
+        for _ in range(100):
+            if results:
+                break
+            time.sleep(0.01)
+        rescanner.stop(timeout=5)
+
+        self.assertTrue(results)
+        self.assertEqual(len(results[0]), 3)
+
+if __name__ == '__main__':
+    unittest.main()
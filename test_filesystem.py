@@ -0,0 +1,112 @@
+import unittest
+import os
+import shutil
+import tempfile
+from filesystem import MemoryFileSystem, ReplayFileSystem, LatencyFileSystem, record_listing
+from media_library import LibraryScanner, EpisodeCache, calculate_average_size
+
+GB = 1024 * 1024 * 1024
+
+class TestMemoryFileSystem(unittest.TestCase):
+    def setUp(self):
+        self.fs = MemoryFileSystem()
+        self.fs.add_file("/lib/Show [G][1080p][BD Encode][SVT-AV1][OPUS]/Season 01/E01.mkv", GB)
+        self.fs.add_file("/lib/Show [G][1080p][BD Encode][SVT-AV1][OPUS]/Season 01/E02.mkv", 3 * GB)
+        self.fs.add_file("/lib/Show [G][1080p][BD Encode][SVT-AV1][OPUS]/Season 02 [WEB-DL]/E01.mkv", 2 * GB)
+        self.fs.add_file("/lib/Movie/movie.mkv", 4 * GB)
+
+    def test_listing(self):
+        names = sorted(entry.name for entry in self.fs.scandir("/lib"))
+        self.assertEqual(names, ["Movie", "Show [G][1080p][BD Encode][SVT-AV1][OPUS]"])
+        self.assertTrue(self.fs.isdir("/lib/Movie"))
+        self.assertTrue(self.fs.exists("/lib/Movie/movie.mkv"))
+        self.assertFalse(self.fs.isdir("/lib/Movie/movie.mkv"))
+        self.assertFalse(self.fs.exists("/lib/Other"))
+
+    def test_listing_errors(self):
+        with self.assertRaises(FileNotFoundError):
+            self.fs.scandir("/lib/Other")
+        with self.assertRaises(NotADirectoryError):
+            self.fs.scandir("/lib/Movie/movie.mkv")
+
+    def test_relative_paths(self):
+        fs = MemoryFileSystem()
+        fs.add_file("lib/a.mkv", GB)
+
+        self.assertEqual([entry.name for entry in fs.scandir("lib")], ["a.mkv"])
+        self.assertEqual([entry.name for entry in fs.scandir(".")], ["lib"])
+        self.assertEqual(ReplayFileSystem("replay").root, "replay")
+
+    def test_episode_cache_uses_fs(self):
+        cache = EpisodeCache(fs=self.fs)
+        episodes = cache.get("/lib/Show [G][1080p][BD Encode][SVT-AV1][OPUS]/Season 01")
+
+        self.assertEqual([ep.name for ep in episodes], ["E01.mkv", "E02.mkv"])
+        self.assertAlmostEqual(episodes[0].deviation, -0.5)
+
+    def test_scan(self):
+        items = LibraryScanner("/lib", fs=self.fs).scan()
+        by_season = {(item.name, item.season): item for item in items}
+
+        self.assertEqual(len(items), 3)
+        self.assertAlmostEqual(by_season[("Show", "Season 01")].avg_size_gb, 2.0)
+        self.assertEqual(by_season[("Show", "Season 02")].source, "WEB-DL")
+        self.assertAlmostEqual(by_season[("Movie", None)].avg_size_gb, 4.0)
+        self.assertAlmostEqual(calculate_average_size("/lib/Movie", fs=self.fs), 4.0)
+
+class TestRecordReplay(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.library = os.path.join(self.test_dir, "library")
+        season = os.path.join(self.library, "Show [G][720p][HDTV][x264][AC3]", "Season 01")
+        os.makedirs(season)
+        for i, size in enumerate([1000, 3000]):
+            with open(os.path.join(season, f"E{i}.mkv"), "wb") as f:
+                f.write(b"\0" * size)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_round_trip(self):
+        for name in ["listing.jsonl", "listing.jsonl.gz"]:
+            recording = os.path.join(self.test_dir, name)
+            count = record_listing(self.library, recording)
+            self.assertEqual(count, 4)
+
+            fs = ReplayFileSystem.load(recording, root="/mnt/replay")
+            replayed = LibraryScanner(fs.root, fs=fs).scan()
+            real = LibraryScanner(self.library).scan()
+
+            self.assertEqual(len(replayed), 1)
+            self.assertEqual(replayed[0].season, real[0].season)
+            self.assertAlmostEqual(replayed[0].avg_size_gb, real[0].avg_size_gb)
+            self.assertTrue(replayed[0].path.startswith("/mnt/replay"))
+
+    def test_symlinked_directories_are_skipped(self):
+        show = os.path.join(self.library, "Show [G][720p][HDTV][x264][AC3]")
+        os.symlink(os.path.join("..", ".."), os.path.join(show, "loop"))
+        recording = os.path.join(self.test_dir, "listing.jsonl")
+
+        count = record_listing(self.library, recording)
+
+        self.assertEqual(count, 4)
+        fs = ReplayFileSystem.load(recording)
+        self.assertFalse(fs.exists(os.path.join(fs.root, os.path.basename(show), "loop")))
+
+class TestLatencyFileSystem(unittest.TestCase):
+    def test_injected_latency(self):
+        inner = MemoryFileSystem()
+        inner.add_file("/lib/Movie/a.mkv", GB)
+        inner.add_file("/lib/Movie/b.mkv", GB)
+        sleeps = []
+        fs = LatencyFileSystem(inner, listing_latency=0.02, stat_latency=0.001, sleep=sleeps.append)
+
+        items = LibraryScanner("/lib", fs=fs).scan()
+
+        self.assertEqual(len(items), 1)
+        # Three listings (root, movie folder, size pass) and two file stats
+        self.assertEqual(sleeps.count(0.02), 3)
+        self.assertEqual(sleeps.count(0.001), 4)  # two stats plus isdir and exists
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,21 +2,26 @@ import unittest
 import os
 import shutil
 import tempfile
-from media_library import MediaItem, MediaParser, calculate_average_size
+import random
+from media_library import MediaItem, MediaParser, calculate_average_size, list_episode_files, EpisodeCache, estimate_average_size, LibraryScanner, TraversalPolicy
+from filesystem import MemoryFileSystem
 
-class TestAverageSize(unittest.TestCase):
+GB = 1024 * 1024 * 1024
+
+class TempDirTestCase(unittest.TestCase):
     def setUp(self):
         self.test_dir = tempfile.mkdtemp()
 
     def tearDown(self):
         shutil.rmtree(self.test_dir)
 
-    def create_file(self, filename, size_bytes):
-        path = os.path.join(self.test_dir, filename)
+    def create_file(self, filename, size_bytes, folder=None):
+        path = os.path.join(folder or self.test_dir, filename)
         with open(path, "wb") as f:
             f.seek(size_bytes - 1)
             f.write(b'\0')
 
+class TestAverageSize(TempDirTestCase):
     def test_calculate_average_size(self):
         # Create 1GB file
         self.create_file("video1.mkv", 1024 * 1024 * 1024)
@@ -39,6 +44,175 @@ class TestAverageSize(unittest.TestCase):
         avg_size = calculate_average_size(self.test_dir)
         self.assertEqual(avg_size, 0.0)
 
+class TestEpisodeFiles(TempDirTestCase):
+    def test_list_episode_files(self):
+        mb = 1024 * 1024
+        self.create_file("E02.mkv", 150 * mb)
+        self.create_file("E01.mkv", 100 * mb)
+        self.create_file("E03.mp4", 50 * mb)
+        self.create_file("E01.srt", mb)
+
+        episodes = list_episode_files(self.test_dir)
+
+        self.assertEqual([ep.name for ep in episodes], ["E01.mkv", "E02.mkv", "E03.mp4"])
+        self.assertAlmostEqual(episodes[0].size_gb, 100 / 1024, places=6)
+        # Mean is 100 MB
+        self.assertAlmostEqual(episodes[0].deviation, 0.0)
+        self.assertAlmostEqual(episodes[1].deviation, 0.5)
+        self.assertAlmostEqual(episodes[2].deviation, -0.5)
+
+    def test_list_episode_files_missing_folder(self):
+        with self.assertRaises(OSError):
+            list_episode_files(os.path.join(self.test_dir, "missing"))
+
+    def test_episode_cache_does_not_cache_failures(self):
+        folder = os.path.join(self.test_dir, "share")
+        cache = EpisodeCache()
+
+        with self.assertRaises(OSError):
+            cache.get(folder)
+        self.assertNotIn(folder, cache)
+
+        # Share comes back
+        os.makedirs(folder)
+        self.create_file("E01.mkv", 100, folder)
+        self.assertEqual([ep.name for ep in cache.get(folder)], ["E01.mkv"])
+
+    def test_episode_cache_lru(self):
+        folders = []
+        for name in ["a", "b", "c"]:
+            folder = os.path.join(self.test_dir, name)
+            os.makedirs(folder)
+            self.create_file("ep.mkv", 100, folder)
+            folders.append(folder)
+
+        cache = EpisodeCache(max_size=2)
+        first = cache.get(folders[0])
+        cache.get(folders[1])
+        # Touch a so b becomes least recently used
+        self.assertIs(cache.get(folders[0]), first)
+        cache.get(folders[2])
+
+        self.assertEqual(len(cache), 2)
+        self.assertIn(folders[0], cache)
+        self.assertNotIn(folders[1], cache)
+        self.assertIn(folders[2], cache)
+
+        cache.invalidate(folders[0])
+        self.assertNotIn(folders[0], cache)
+
+class TestEstimateAverageSize(TempDirTestCase):
+    def test_small_folder_is_exact(self):
+        self.create_file("video1.mkv", 1024 * 1024 * 1024)
+        self.create_file("video2.mkv", 2 * 1024 * 1024 * 1024)
+
+        estimate = estimate_average_size(self.test_dir, sample_size=5)
+
+        self.assertTrue(estimate.is_exact)
+        self.assertEqual(estimate.total, 2)
+        self.assertAlmostEqual(estimate.avg_gb, 1.5, places=2)
+        self.assertEqual(estimate.error_gb, 0.0)
+
+    def test_large_folder_is_sampled(self):
+        mb = 1024 * 1024
+        for i in range(40):
+            self.create_file(f"E{i:02d}.mkv", (100 + i) * mb)
+
+        estimate = estimate_average_size(self.test_dir, sample_size=8, rng=random.Random(1))
+        exact = calculate_average_size(self.test_dir)
+
+        self.assertFalse(estimate.is_exact)
+        self.assertEqual(estimate.sampled, 8)
+        self.assertEqual(estimate.total, 40)
+        self.assertGreater(estimate.error_gb, 0.0)
+        self.assertLessEqual(abs(estimate.avg_gb - exact), estimate.error_gb * 2)
+
+    def test_sample_size_must_be_positive(self):
+        self.create_file("video1.mkv", 1024)
+
+        for sample_size in (0, -1):
+            with self.assertRaises(ValueError):
+                estimate_average_size(self.test_dir, sample_size=sample_size)
+            with self.assertRaises(ValueError):
+                LibraryScanner(self.test_dir, sample_size=sample_size)
+
+    def test_scanner_sample_and_refine(self):
+        season = os.path.join(self.test_dir, "Show [G][1080p][BD][x265][AAC]", "Season 01")
+        os.makedirs(season)
+        for i in range(10):
+            self.create_file(f"E{i:02d}.mkv", (i + 1) * 1024 * 1024, season)
+
+        scanner = LibraryScanner(self.test_dir, sample_size=3)
+        items = scanner.scan()
+        self.assertEqual(len(items), 1)
+        self.assertTrue(items[0].is_estimate)
+
+        refined = scanner.refine(items)
+        self.assertFalse(refined[0].is_estimate)
+        self.assertEqual(refined[0].size_error_gb, 0.0)
+        self.assertAlmostEqual(refined[0].avg_size_gb, calculate_average_size(season))
+        # Original estimates are left untouched
+        self.assertTrue(items[0].is_estimate)
+
+class CountingFileSystem(MemoryFileSystem):
+    def __init__(self):
+        super().__init__()
+        self.listed = []
+
+    def scandir(self, path):
+        self.listed.append(path)
+        return super().scandir(path)
+
+class TestTraversalPolicy(unittest.TestCase):
+    def setUp(self):
+        self.fs = CountingFileSystem()
+        self.fs.add_file("/lib/Show/Season 01/E01.mkv", GB)
+        self.fs.add_file("/lib/Show/Extras/Featurette/clip.mkv", GB)
+        self.fs.add_file("/lib/Show/Disc 2/Season 02/E01.mkv", GB)
+        self.fs.add_file("/lib/Anime/S01/E01.mkv", GB)
+        self.fs.add_file("/lib/Anime/Specials/SP1.mkv", GB)
+        self.fs.add_file("/lib/Anime/Part 2/E01.mkv", GB)
+        self.fs.add_file("/lib/.@__thumb/thumb.mkv", GB)
+        # A real series that happens to be called Extras
+        self.fs.add_file("/lib/Extras/Season 01/E01.mkv", GB)
+
+    def test_default_policy(self):
+        items = LibraryScanner("/lib", fs=self.fs).scan()
+        seasons = sorted((item.name, item.season) for item in items)
+
+        self.assertEqual(seasons, [("Anime", None), ("Extras", "Season 01"), ("Show", "Season 01")])
+        self.assertNotIn("/lib/.@__thumb", self.fs.listed)
+        self.assertNotIn("/lib/Show/Extras", self.fs.listed)
+        # Depth 1 does not descend into non-season folders
+        self.assertNotIn("/lib/Show/Disc 2", self.fs.listed)
+
+    def test_season_patterns_and_depth(self):
+        policy = TraversalPolicy(max_depth=2, season_patterns=("season*", "S[0-9][0-9]", "specials", "part *"))
+        items = LibraryScanner("/lib", fs=self.fs, policy=policy).scan()
+        seasons = sorted((item.name, item.season) for item in items)
+
+        self.assertEqual(seasons, [
+            ("Anime", "Part 2"), ("Anime", "S01"), ("Anime", "Specials"),
+            ("Extras", "Season 01"), ("Show", "Season 01"), ("Show", "Season 02"),
+        ])
+        # Excluded subtrees are pruned before they are listed
+        self.assertNotIn("/lib/Show/Extras", self.fs.listed)
+        self.assertNotIn("/lib/Show/Extras/Featurette", self.fs.listed)
+
+    def test_include_patterns(self):
+        policy = TraversalPolicy.from_config({"include": ["anime*"], "season_patterns": ["s??"]})
+        items = LibraryScanner("/lib", fs=self.fs, policy=policy).scan()
+
+        self.assertEqual([(item.name, item.season) for item in items], [("Anime", "S01")])
+        self.assertNotIn("/lib/Show", self.fs.listed)
+
+    def test_max_depth_zero(self):
+        policy = TraversalPolicy(max_depth=0)
+        items = LibraryScanner("/lib", fs=self.fs, policy=policy).scan()
+
+        self.assertEqual(sorted(item.name for item in items), ["Anime", "Extras", "Show"])
+        self.assertTrue(all(item.season is None for item in items))
+
 class TestMediaParser(unittest.TestCase):
     def test_parse_root_folder_strict(self):
         folder = "To Your Eternity [Zaki][1080p][BD Encode][SVT-AV1][OPUS2.0]"
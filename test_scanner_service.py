@@ -0,0 +1,185 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import urllib.error
+from filesystem import MemoryFileSystem
+from media_library import MediaItem
+from scanner_service import ScannerService, ScannerClient, make_server, item_to_dict, item_from_dict
+
+class TestScannerService(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        for show in ["Bravo [G][1080p][BD Encode][x265][AAC]", "alpha [G][720p][WEB-DL][H.264][AAC]"]:
+            os.makedirs(os.path.join(self.test_dir, show, "Season 01"))
+            os.makedirs(os.path.join(self.test_dir, show, "Season 02"))
+        os.makedirs(os.path.join(self.test_dir, "Charlie Movie"))
+
+        self.service = ScannerService(self.test_dir, refresh_interval=3600)
+        self.service.refresh()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_refresh_populates_index(self):
+        status = self.service.status()
+        self.assertEqual(status["item_count"], 5)
+        self.assertEqual(status["generation"], 1)
+        self.assertEqual(status["state"], "idle")
+
+    def test_query_sort_and_page(self):
+        total, page, generation = self.service.query(offset=1, limit=2, sort="name")
+        self.assertEqual(generation, 1)
+        self.assertEqual(total, 5)
+        self.assertEqual([item.name for item in page], ["alpha", "Bravo"])
+
+    def test_query_filter(self):
+        total, items, _ = self.service.query(filter_text="CHARLIE")
+        self.assertEqual(total, 1)
+        self.assertEqual(items[0].name, "Charlie Movie")
+
+    def test_query_unknown_sort(self):
+        with self.assertRaises(ValueError):
+            self.service.query(sort="nope")
+
+    def test_sorted_index_reused_until_refresh(self):
+        calls = []
+        original = self.service._sorted_items
+
+        def counting_sorted_items(*args):
+            result = original(*args)
+            calls.append(result)
+            return result
+
+        self.service._sorted_items = counting_sorted_items
+        self.service.query(offset=0, limit=2, sort="name")
+        self.service.query(offset=2, limit=2, sort="name")
+        self.assertIs(calls[0], calls[1])
+
+        os.makedirs(os.path.join(self.test_dir, "Delta Movie"))
+        self.service.refresh()
+        total, page, generation = self.service.query(offset=4, limit=2, sort="name")
+        self.assertIsNot(calls[2], calls[0])
+        self.assertEqual((total, generation), (6, 2))
+        self.assertEqual([item.name for item in page], ["Charlie Movie", "Delta Movie"])
+
+    def test_sorted_query_with_filter(self):
+        total, items, _ = self.service.query(sort="name", reverse=True, filter_text="a")
+        self.assertEqual(total, 5)
+        self.assertEqual([item.name for item in items][:2], ["Charlie Movie", "Bravo"])
+
+    def test_item_round_trip(self):
+        item = MediaItem("Show", "G", "1080p", "BD", "x265", "AAC", season="Season 01", path="/p", avg_size_gb=1.5)
+        self.assertEqual(item_from_dict(item_to_dict(item)), item)
+
+class TestScannerServiceFileSystem(unittest.TestCase):
+    def test_scan_and_episodes_use_service_filesystem(self):
+        fs = MemoryFileSystem()
+        folder = "/library/Show [G][1080p][BD][x265][AAC]"
+        fs.add_file(folder + "/E01.mkv", 100)
+        fs.add_file(folder + "/E02.mkv", 300)
+
+        service = ScannerService("/library", refresh_interval=3600, fs=fs)
+        service.refresh()
+        episodes = service.episodes(folder)
+
+        self.assertEqual(service.status()["item_count"], 1)
+        self.assertEqual([ep.name for ep in episodes], ["E01.mkv", "E02.mkv"])
+        self.assertAlmostEqual(episodes[1].deviation, 0.5)
+
+class TestScannerHTTP(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        for i in range(7):
+            os.makedirs(os.path.join(self.test_dir, f"Show {i}"))
+
+        self.service = ScannerService(self.test_dir, refresh_interval=3600)
+        self.service.refresh()
+        self.server = make_server(self.service, port=0)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        host, port = self.server.server_address[:2]
+        self.client = ScannerClient(f"http://{host}:{port}")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.test_dir)
+
+    def test_status(self):
+        status = self.client.status()
+        self.assertEqual(status["item_count"], 7)
+        self.assertEqual(status["root_path"], self.test_dir)
+
+    def test_paged_query(self):
+        total, page, _ = self.client.query(offset=2, limit=3, sort="name", reverse=True)
+        self.assertEqual(total, 7)
+        self.assertEqual([item.name for item in page], ["Show 4", "Show 3", "Show 2"])
+
+    def test_fetch_all_pages(self):
+        generation, items = self.client.fetch_all(page_size=3)
+        self.assertEqual(generation, 1)
+        self.assertEqual(sorted(item.name for item in items), [f"Show {i}" for i in range(7)])
+
+    def test_fetch_all_restarts_on_generation_change(self):
+        original_query = self.client.query
+        calls = []
+
+        def query_with_rescan(**kwargs):
+            calls.append(kwargs["offset"])
+            result = original_query(**kwargs)
+            if len(calls) == 1:
+                # Rescan lands between the first and second page
+                os.makedirs(os.path.join(self.test_dir, "Show 7"))
+                self.service.refresh()
+            return result
+
+        self.client.query = query_with_rescan
+        generation, items = self.client.fetch_all(page_size=3)
+
+        self.assertEqual(generation, 2)
+        self.assertEqual(len(items), 8)
+        self.assertEqual(len({item.path for item in items}), 8)
+        self.assertEqual(calls[:3], [0, 3, 0])
+
+    def test_episodes(self):
+        folder = os.path.join(self.test_dir, "Show 1")
+        for name, size in [("E01.mkv", 100), ("E02.mkv", 300)]:
+            with open(os.path.join(folder, name), "wb") as f:
+                f.write(b"\0" * size)
+
+        episodes = self.client.episodes(folder)
+
+        self.assertEqual([ep.name for ep in episodes], ["E01.mkv", "E02.mkv"])
+        self.assertAlmostEqual(episodes[0].deviation, -0.5)
+
+    def test_episodes_rejects_unindexed_path(self):
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            self.client.episodes(os.path.dirname(self.test_dir))
+        self.assertEqual(ctx.exception.code, 404)
+
+    def test_episodes_listing_failure_is_server_error(self):
+        folder = os.path.join(self.test_dir, "Show 2")
+        shutil.rmtree(folder)
+
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            self.client.episodes(folder)
+        self.assertEqual(ctx.exception.code, 503)
+
+    def test_rescan_picks_up_changes(self):
+        os.makedirs(os.path.join(self.test_dir, "Show 7"))
+        self.service.start()
+        try:
+            self.client.rescan()
+            # The background loop runs once on start and once more for the wake-up
+            for _ in range(100):
+                if self.client.status()["item_count"] == 8:
+                    break
+                threading.Event().wait(0.05)
+            self.assertEqual(self.client.status()["item_count"], 8)
+        finally:
+            self.service.stop(timeout=5)
+
+if __name__ == '__main__':
+    unittest.main()